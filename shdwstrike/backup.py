@@ -10,11 +10,19 @@ async def export_channel_backup(btc, channel_point):
         print(f"Failed to export channel backup: {e}")
 
 async def handle_lightning_operations(btc, channel_point):
-    print(f"Node ID: {await btc.node_id}")
-    print(f"Invoice: {await btc.add_invoice(0.5, 'Description')}")
-    print(f"Peers: {await btc.list_peers()}")
-    print(f"Channels: {await btc.list_channels()}")
-    
+    # The four queries are independent, so run them concurrently instead of
+    # paying one round-trip after another.
+    node_id, invoice, peers, channels = await asyncio.gather(
+        btc.node_id,
+        btc.add_invoice(0.5, 'Description'),
+        btc.list_peers(),
+        btc.list_channels(),
+    )
+    print(f"Node ID: {node_id}")
+    print(f"Invoice: {invoice}")
+    print(f"Peers: {peers}")
+    print(f"Channels: {channels}")
+
     if channel_point:
         await export_channel_backup(btc, channel_point)
 
@@ -30,4 +38,9 @@ async def main():
     await handle_lightning_operations(btc, args.channel_point)
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file
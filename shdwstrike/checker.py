@@ -1,124 +1,270 @@
-import aiohttp
-import json
 import logging
+import orjson
 import time
 from decimal import Decimal, ROUND_HALF_UP
 
+from rpc import get_session, basic_auth
+
+try:
+    import ijson
+except ImportError:
+    # Optional: without ijson responses are buffered and parsed in one go.
+    ijson = None
+
 async def fetch_json_rpc_response(session, url, payload, auth):
     """
     Generic function to fetch JSON RPC response.
-    
+
     :param session: An aiohttp session object.
     :param url: URL to make the post request.
     :param payload: JSON payload for the post request.
     :param auth: Authentication details for the request.
     :return: JSON response as a dictionary.
     """
-    async with session.post(url, json=payload, auth=auth, headers={'Content-Type': 'application/json'}) as response:
+    async with session.post(url, data=orjson.dumps(payload), auth=auth, headers={'Content-Type': 'application/json'}) as response:
         if response.status == 200:
-            return await response.json()
+            return orjson.loads(await response.read())
         else:
-            raise Exception(f"{response.status} - {await response.text}")
+            # Cap the error body instead of buffering it whole; a failing
+            # daemon can still answer with a multi-megabyte payload.
+            body = (await response.content.read(2048)).decode('utf-8', 'replace')
+            raise Exception(f"{response.status} - {body}")
 
 
 
-# Ensure logging is properly configured to capture debug messages and errors.
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+# One XMR expressed in atomic units (piconero).
+ATOMIC_UNITS_PER_XMR = 10**12
+_XMR_DIVISOR = Decimal(ATOMIC_UNITS_PER_XMR)
 
+# Sentinel max_height for height-filtered get_transfers calls.
+_MAX_HEIGHT = 500000000
 
-async def check_incoming_transfers(subaddress_index, rpc_url, rpc_username, rpc_password, requested_amount_str):
-    requested_amount = Decimal(requested_amount_str)  # Convert the requested amount to Decimal.
+# Static portions of the get_transfers payloads, built once. Per call only a
+# shallow copy gets the subaddr_indices (and optional height filter) slotted in.
+_BASE_GET_TRANSFERS = {
+    "jsonrpc": "2.0",
+    "id": "0",
+    "method": "get_transfers",
+    "params": {
+        "in": True, "out": False, "pending": True, "failed": False,
+        "pool": True, "filter_by_height": False,
+        "account_index": 0, "all_accounts": False
+    }
+}
 
-    # Define the payload for the Monero RPC call.
-    payload_get_transfers = {
-        "jsonrpc": "2.0",
-        "id": "0",
-        "method": "get_transfers",
-        "params": {
-            "in": True, "out": False, "pending": True, "failed": False,
-            "pool": True, "filter_by_height": False, 
-            "account_index": 0, "subaddr_indices": [subaddress_index],
-            "all_accounts": False
-        }
+_BASE_GET_TRANSFERS_0CONF = {
+    "jsonrpc": "2.0",
+    "id": "0",
+    "method": "get_transfers",
+    "params": {
+        "in": True,
+        "pending": True,
+        "failed": False,
+        "pool": True,
+        "filter_by_height": False,
+        "account_index": 0
     }
+}
+
+def _build_get_transfers_payload(base, subaddr_indices, min_height=0):
+    """Assemble a get_transfers payload from a prebuilt template."""
+    params = {**base["params"], "subaddr_indices": subaddr_indices}
+    _apply_height_filter(params, min_height)
+    return {**base, "params": params}
+
+def _is_valid_transfer(transfer):
+    return transfer.get('unlock_time', 0) == 0 and not transfer.get('double_spend_seen', False)
+
+async def _stream_transfer_sums(session, url, payload, auth, zero_conf=False, stop_at_atomic=None):
+    """
+    Stream a get_transfers response with ijson and return the atomic sums
+    (pending, valid) without ever buffering the full JSON body.
+    """
+    pending_atomic = 0
+    valid_atomic = 0
+    async with session.post(url, data=orjson.dumps(payload), auth=auth,
+                            headers={'Content-Type': 'application/json'}) as response:
+        if response.status != 200:
+            body = (await response.content.read(2048)).decode('utf-8', 'replace')
+            raise Exception(f"{response.status} - {body}")
+
+        section = None  # 'pool' or 'in' while inside a transfer object
+        current = {}
+        async for prefix, event, value in ijson.parse_async(response.content):
+            if event == 'start_map' and prefix in ('result.pool.item', 'result.in.item'):
+                section = prefix.split('.')[1]
+                current = {}
+            elif section is not None and prefix in (
+                    f'result.{section}.item.amount',
+                    f'result.{section}.item.unlock_time',
+                    f'result.{section}.item.double_spend_seen'):
+                current[prefix.rsplit('.', 1)[1]] = value
+            elif event == 'end_map' and section is not None and prefix == f'result.{section}.item':
+                amount = current.get('amount', 0)
+                if section == 'pool':
+                    pending_atomic += amount
+                    if zero_conf and _is_valid_transfer(current):
+                        valid_atomic += amount
+                elif _is_valid_transfer(current):
+                    valid_atomic += amount
+                section = None
+                if stop_at_atomic is not None and valid_atomic >= stop_at_atomic:
+                    break
+    return pending_atomic, valid_atomic
+
+async def _fetch_transfer_sums(session, url, payload, auth, zero_conf=False, stop_at_atomic=None):
+    """
+    Fetch a get_transfers response and reduce it to atomic sums.
+
+    Uses the incremental ijson parser when available so peak memory stays
+    flat regardless of how many transfers the daemon returns; otherwise the
+    body is buffered and summed in one pass.
+
+    :param zero_conf: Also count valid pool (unconfirmed) transfers toward
+                      the valid total.
+    :param stop_at_atomic: Stop summing valid transfers once this atomic
+                           amount is reached.
+    :return: Tuple of (pending_atomic, valid_atomic).
+    """
+    if ijson is not None:
+        return await _stream_transfer_sums(session, url, payload, auth, zero_conf, stop_at_atomic)
+
+    response_data = await fetch_json_rpc_response(session, url, payload, auth)
+    result = response_data.get('result', {})
+    pool_transfers = result.get('pool', [])
+    in_transfers = result.get('in', [])
+
+    pending_atomic = sum(t['amount'] for t in pool_transfers)
+    valid_atomic = 0
+    candidates = pool_transfers + in_transfers if zero_conf else in_transfers
+    for t in candidates:
+        if _is_valid_transfer(t):
+            valid_atomic += t['amount']
+            if stop_at_atomic is not None and valid_atomic >= stop_at_atomic:
+                break
+    return pending_atomic, valid_atomic
+
+def _apply_height_filter(params, min_height):
+    """Restrict a get_transfers params dict to blocks at or above min_height."""
+    if min_height:
+        params["filter_by_height"] = True
+        params["min_height"] = min_height
+        params["max_height"] = _MAX_HEIGHT
+
+
+async def check_incoming_transfers(subaddress_index, rpc_url, rpc_username, rpc_password, requested_amount_str, min_height=0):
+    # Work in atomic units so the hot loop only does integer arithmetic.
+    requested_amount_atomic = int(Decimal(requested_amount_str) * ATOMIC_UNITS_PER_XMR)
+
+    # Only ask the daemon for transfers since the invoice was created; the
+    # full history of the subaddress is irrelevant to this payment.
+    payload_get_transfers = _build_get_transfers_payload(
+        _BASE_GET_TRANSFERS, [subaddress_index], min_height)
 
     try:
-        # Create a session and post a request to the Monero RPC.
-        async with aiohttp.ClientSession() as session:
-            async with session.post(rpc_url, json=payload_get_transfers, auth=aiohttp.BasicAuth(rpc_username, rpc_password)) as response:
-                if response.status == 200:
-                    response_data = await response.json()
-                    logging.debug("Raw transactions response: %s", response_data)
-
-                    # Process the transactions from 'pool'.
-                    pool_transfers = response_data.get('result', {}).get('pool', [])
-                    logging.debug(f"Pending (pool) transfers: {pool_transfers}")
-                    in_transfers = response_data.get('result', {}).get('in', [])
-                    
-                    pending_amount_received_atomic = sum(transfer['amount'] for transfer in pool_transfers)
-                    pending_amount_received_xmr = Decimal(pending_amount_received_atomic) / Decimal('1e12')
-                    
-                    valid_transfers = [t for t in in_transfers if t.get('unlock_time', 0) == 0 and not t.get('double_spend_seen', False)]
-                    logging.debug(f"Valid transfers: {valid_transfers}")
-                    valid_total_amount_received_xmr = sum(Decimal(t['amount']) for t in valid_transfers) / Decimal('1e12')
-                    
-                    payment_received = valid_total_amount_received_xmr >= requested_amount
-
-                    return {
-                        'payment_received': payment_received,
-                        'pending_amount_received_xmr': float(pending_amount_received_xmr),
-                        'timestamp': int(time.time()),
-                        'valid_total_amount_received_xmr': float(valid_total_amount_received_xmr),
-                    }
-                else:
-                    logging.error("Monero RPC request failed with status: %s", response.status)
-                    return {'error': f"RPC request failed with status {response.status}"}
+        # Post the request to the Monero RPC over the shared session and
+        # reduce the response to atomic sums as it is parsed.
+        session = await get_session()
+        pending_amount_received_atomic, valid_total_amount_received_atomic = await _fetch_transfer_sums(
+            session, rpc_url, payload_get_transfers, basic_auth(rpc_username, rpc_password))
+
+        payment_received = valid_total_amount_received_atomic >= requested_amount_atomic
+
+        return {
+            'payment_received': payment_received,
+            'pending_amount_received_xmr': float(Decimal(pending_amount_received_atomic) / _XMR_DIVISOR),
+            'timestamp': int(time.time()),
+            'valid_total_amount_received_xmr': float(Decimal(valid_total_amount_received_atomic) / _XMR_DIVISOR),
+        }
     except Exception as e:
         logging.error("Error when checking incoming transfers: %s", e)
         return {'error': str(e)}
 
-async def check_incoming_transfers_0conf(subaddress_index, rpc_url, rpc_username, rpc_password, requested_amount_str):
-    requested_amount = Decimal(requested_amount_str)  # Convert the requested amount to Decimal.
+async def check_incoming_transfers_batch(subaddress_indices, rpc_url, rpc_username, rpc_password, requested_amounts):
+    """
+    Check incoming transfers for several subaddresses with one RPC call.
+
+    Instead of firing one get_transfers request per pending invoice, all
+    indices are passed in a single `subaddr_indices` list and the response
+    is demultiplexed per subaddress afterwards.
+
+    :param subaddress_indices: List of subaddress indices to poll.
+    :param rpc_url: URL of the Monero wallet RPC.
+    :param rpc_username: RPC username for authentication.
+    :param rpc_password: RPC password for authentication.
+    :param requested_amounts: Mapping of subaddress index to the requested
+                              amount (string or Decimal) for that invoice.
+    :return: Mapping of subaddress index to the same result dictionary that
+             check_incoming_transfers returns, or {'error': ...} on failure.
+    """
+    payload_get_transfers = _build_get_transfers_payload(
+        _BASE_GET_TRANSFERS, list(subaddress_indices))
+
+    try:
+        session = await get_session()
+        response_data = await fetch_json_rpc_response(
+            session, rpc_url, payload_get_transfers, basic_auth(rpc_username, rpc_password))
+
+        result = response_data.get('result', {})
+        pool_transfers = result.get('pool', [])
+        in_transfers = result.get('in', [])
+
+        # Group atomic amounts per subaddress; divide by 1e12 once at the end.
+        pending_atomic = {index: 0 for index in subaddress_indices}
+        valid_atomic = {index: 0 for index in subaddress_indices}
+
+        for transfer in pool_transfers:
+            minor = transfer.get('subaddr_index', {}).get('minor')
+            if minor in pending_atomic:
+                pending_atomic[minor] += transfer['amount']
+
+        for transfer in in_transfers:
+            if transfer.get('unlock_time', 0) != 0 or transfer.get('double_spend_seen', False):
+                continue
+            minor = transfer.get('subaddr_index', {}).get('minor')
+            if minor in valid_atomic:
+                valid_atomic[minor] += transfer['amount']
+
+        timestamp = int(time.time())
+        results = {}
+        for index in subaddress_indices:
+            requested_atomic = int(Decimal(requested_amounts[index]) * ATOMIC_UNITS_PER_XMR)
+            results[index] = {
+                'payment_received': valid_atomic[index] >= requested_atomic,
+                'pending_amount_received_xmr': float(Decimal(pending_atomic[index]) / _XMR_DIVISOR),
+                'timestamp': timestamp,
+                'valid_total_amount_received_xmr': float(Decimal(valid_atomic[index]) / _XMR_DIVISOR),
+            }
+        return results
+    except Exception as e:
+        logging.error("Error when batch checking incoming transfers: %s", e)
+        return {index: {'error': str(e)} for index in subaddress_indices}
+
+async def check_incoming_transfers_0conf(subaddress_index, rpc_url, rpc_username, rpc_password, requested_amount_str, min_height=0):
+    # Work in atomic units so the hot loop only does integer arithmetic.
+    requested_amount_atomic = int(Decimal(requested_amount_str) * ATOMIC_UNITS_PER_XMR)
 
     # Payload to check both pending and confirmed transactions to a specific subaddress.
-    payload_get_transfers = {
-        "jsonrpc": "2.0",
-        "id": "0",
-        "method": "get_transfers",
-        "params": {
-            "in": True,
-            "pending": True,
-            "failed": False,
-            "pool": True,
-            "filter_by_height": False, 
-            "account_index": 0,
-            "subaddr_indices": [subaddress_index]
-        }
-    }
+    payload_get_transfers = _build_get_transfers_payload(
+        _BASE_GET_TRANSFERS_0CONF, [subaddress_index], min_height)
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(rpc_url, json=payload_get_transfers, auth=aiohttp.BasicAuth(rpc_username, rpc_password)) as response:
-                if response.status == 200:
-                    response_data = await response.json()
-                    pool_transfers = response_data.get('result', {}).get('pool', [])
-                    in_transfers = response_data.get('result', {}).get('in', [])  # Confirmed incoming transfers.
-
-                    # Considering both pending and confirmed transfers
-                    total_transfers = pool_transfers + in_transfers
-                    valid_transfers = [t for t in total_transfers if t.get('unlock_time', 0) == 0 and not t.get('double_spend_seen', False)]
-                    valid_total_amount_received = sum(Decimal(t['amount']) for t in valid_transfers) / Decimal('1e12')
-
-                    payment_received = valid_total_amount_received >= requested_amount
-
-                    return {
-                        'payment_received': payment_received,
-                        'timestamp': int(time.time()),
-                        'valid_total_amount_received_xmr': float(valid_total_amount_received),
-                        # Assuming pending_amount_received_xmr may still be relevant.
-                        'pending_amount_received_xmr': float(sum(Decimal(t['amount']) for t in pool_transfers) / Decimal('1e12')),
-                    }
-                else:
-                    return {'error': f"RPC request failed with status {response.status}"}
+        # Considering both pending and confirmed transfers. Summation stops
+        # as soon as the requested amount is covered; the remaining transfers
+        # cannot change the outcome of this poll.
+        session = await get_session()
+        pending_amount_received_atomic, valid_total_amount_received_atomic = await _fetch_transfer_sums(
+            session, rpc_url, payload_get_transfers, basic_auth(rpc_username, rpc_password),
+            zero_conf=True, stop_at_atomic=requested_amount_atomic)
+
+        payment_received = valid_total_amount_received_atomic >= requested_amount_atomic
+
+        return {
+            'payment_received': payment_received,
+            'timestamp': int(time.time()),
+            'valid_total_amount_received_xmr': float(Decimal(valid_total_amount_received_atomic) / _XMR_DIVISOR),
+            # Assuming pending_amount_received_xmr may still be relevant.
+            'pending_amount_received_xmr': float(Decimal(pending_amount_received_atomic) / _XMR_DIVISOR),
+        }
     except Exception as e:
-        return {'error': str(e)}
\ No newline at end of file
+        return {'error': str(e)}
@@ -1,8 +1,40 @@
 import decimal
 import asyncio
+import time
+from functools import lru_cache
 from electrum.lnaddr import lndecode, LnDecodeException
 from xmrbtc import get_xmr_btc_price
 
+# Decoding is a pure function of the invoice string (bech32 parse plus
+# signature check), so repeated submissions of the same invoice hit the cache.
+_cached_lndecode = lru_cache(maxsize=1024)(lndecode)
+
+# TTL cache for the XMR/BTC rate so invoices generated close together share
+# one fetch instead of each paying a round-trip to the price oracle.
+RATE_TTL_SECONDS = 30
+_rate_cache = None  # (rate, monotonic timestamp of fetch)
+_rate_lock = asyncio.Lock()
+
+async def get_cached_xmr_btc_price():
+    """
+    Return the XMR/BTC rate, refreshing it at most once per RATE_TTL_SECONDS.
+
+    Concurrent callers coalesce on a lock so a cache miss triggers a single
+    fetch rather than one per caller.
+    """
+    global _rate_cache
+    if _rate_cache is not None and time.monotonic() - _rate_cache[1] < RATE_TTL_SECONDS:
+        return _rate_cache[0]
+
+    async with _rate_lock:
+        # Another caller may have refreshed the rate while we waited.
+        if _rate_cache is not None and time.monotonic() - _rate_cache[1] < RATE_TTL_SECONDS:
+            return _rate_cache[0]
+        rate = await get_xmr_btc_price()
+        if rate is not None:
+            _rate_cache = (rate, time.monotonic())
+        return rate
+
 async def decode_lightning_invoice(invoice):
     """
     Decode a lightning network invoice and calculate the equivalent amount in Monero (XMR) including fees.
@@ -12,23 +44,23 @@ async def decode_lightning_invoice(invoice):
 
     Returns:
     - dict: A dictionary containing decoded invoice details and the equivalent XMR amount including fees, if the rate is available.
-    
+
     Raises:
     - ValueError: If there's an error decoding the invoice or if the XMR/BTC rate is not available.
     """
     try:
-        decoded_info = lndecode(invoice)
-        
+        decoded_info = _cached_lndecode(invoice)
+
         # Extracting necessary details from the decoded invoice
         payment_hash = decoded_info.paymenthash.hex()
         amount_btc = decoded_info.amount
         description = decoded_info.get_description()
-        
+
         # Fetching the XMR/BTC exchange rate
-        xmr_btc_rate = await get_xmr_btc_price()
+        xmr_btc_rate = await get_cached_xmr_btc_price()
         if xmr_btc_rate is None:
             raise Exception("XMR/BTC rate is not available")
-        
+
         # Calculating the equivalent amount in XMR including the 5% fee
         equivalent_xmr, equivalent_xmr_with_fee = calculate_equivalent_xmr(amount_btc, xmr_btc_rate)
 
@@ -40,7 +72,7 @@ async def decode_lightning_invoice(invoice):
             'xmr_btc_rate': xmr_btc_rate,
             'equivalent_xmr_with_fee': equivalent_xmr_with_fee
         }
-        
+
     except LnDecodeException as e:
         raise ValueError(f'Error decoding invoice: {str(e)}')
     except Exception as e:
@@ -57,16 +89,20 @@ def calculate_equivalent_xmr(amount_btc, xmr_btc_rate):
     Returns:
     - tuple: The equivalent amount in XMR without fee, and with a 5% fee applied (considering fee).
     """
-    equivalent_xmr_without_fee = decimal.Decimal(amount_btc) / decimal.Decimal(xmr_btc_rate)
-    fee_percentage = decimal.Decimal('0.05')  # 5% fee
-    fee_amount = equivalent_xmr_without_fee * fee_percentage
-    equivalent_xmr_with_fee = equivalent_xmr_without_fee + fee_amount
-
-    # Round equivalent_xmr_with_fee to 12 decimals
-    equivalent_xmr_with_fee = equivalent_xmr_with_fee.quantize(decimal.Decimal('0.000000000001'))
-    
+    # Fixed-point integer math scaled to atomic XMR (10**12): convert the
+    # inputs once, then everything is integer multiply/divide, which is far
+    # cheaper than chained Decimal arithmetic and already exact to 12 places.
+    rate_pico = int(round(float(xmr_btc_rate) * 10**12))
+    amount_sat = int((decimal.Decimal(amount_btc) * 10**8).to_integral_value())
+
+    equivalent_atomic = amount_sat * 10**12 * 10**12 // (rate_pico * 10**8)
+    equivalent_atomic_with_fee = equivalent_atomic * 105 // 100  # 5% fee
+
+    equivalent_xmr_without_fee = decimal.Decimal(equivalent_atomic).scaleb(-12)
+    equivalent_xmr_with_fee = decimal.Decimal(equivalent_atomic_with_fee).scaleb(-12)
+
     return equivalent_xmr_without_fee, equivalent_xmr_with_fee
 
 if __name__ == "__main__":
     test_invoice = "<paste_a_lightning_network_invoice_here>"
-    asyncio.run(decode_lightning_invoice(test_invoice))
\ No newline at end of file
+    asyncio.run(decode_lightning_invoice(test_invoice))
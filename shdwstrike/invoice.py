@@ -1,11 +1,18 @@
+import asyncio
 import logging
-import requests
+import os
 import qrcode
-from io import BytesIO
+import qrcode.image.svg
 import base64
+from functools import lru_cache
 from decimal import Decimal, ROUND_HALF_UP
 from decoder import decode_lightning_invoice  # Make sure this import points to the correct location
-from xmr import create_monero_address, construct_monero_uri
+from xmr import create_monero_address, construct_monero_uri, get_wallet_height
+
+# Bound concurrent invoice generation. wallet-rpc serves commands from a
+# single queue, so unbounded tasks only pile up memory and queuing delay.
+MAX_CONCURRENT_INVOICES = int(os.environ.get('SHDWSTRIKE_MAX_CONCURRENT_INVOICES', 32))
+_invoice_semaphore = asyncio.Semaphore(MAX_CONCURRENT_INVOICES)
 
 async def generate_monero_invoice(invoice, rpc_url, rpc_username, rpc_password, session):
     """
@@ -21,26 +28,45 @@ async def generate_monero_invoice(invoice, rpc_url, rpc_username, rpc_password,
     Returns:
     - tuple: Containing Monero invoice (dict), Monero URI (str), and Monero QR code (base64 str) if generation succeeds, else (None, None, None).
     """
-    # Check for pre-existing Monero invoice details in session to avoid re-generation
-    if all(key in session for key in ['monero_invoice', 'monero_uri', 'monero_qr_code']):
-        return session['monero_invoice'], session['monero_uri'], session['monero_qr_code']
+    # Check for a pre-existing Monero invoice bundle in session to avoid
+    # re-generation. A single key means one lookup and no partially written
+    # cache states.
+    cached_bundle = session.get('monero_invoice_bundle')
+    if cached_bundle is not None:
+        monero_invoice, monero_uri = cached_bundle
+        # The QR renderer is memoized by URI, so this is a cache lookup.
+        return monero_invoice, monero_uri, generate_qr_code_base64(monero_uri)
 
     try:
-        decoded_info = await decode_lightning_invoice(invoice)
-        xmr_amount_with_fee = calculate_xmr_amount_with_fee(decoded_info)
+        # Backpressure: only a bounded number of invoices may hold RPC work
+        # in flight at once; the rest wait here instead of piling up tasks.
+        async with _invoice_semaphore:
+            decoded_info = await decode_lightning_invoice(invoice)
+            xmr_amount_with_fee = calculate_xmr_amount_with_fee(decoded_info)
+
+            subaddress = await create_monero_subaddress(rpc_url, rpc_username, rpc_password, session)
+            if not subaddress:
+                return None, None, None
 
-        subaddress = await create_monero_subaddress(rpc_url, rpc_username, rpc_password, session)
-        if not subaddress:
-            return None, None, None
+            # Pin the wallet height at invoice creation so payment polls can ask
+            # the daemon only for transfers from this height onwards. The RPC's
+            # min_height is exclusive and get_height reports the next block's
+            # index, so back off by one or a payment confirming in the very
+            # first block after creation would be filtered out forever.
+            wallet_height = await get_wallet_height(rpc_url, rpc_username, rpc_password)
+            session['invoice_creation_height'] = max(wallet_height - 1, 0)
 
-        monero_uri = construct_monero_uri(subaddress, xmr_amount_with_fee)
-        monero_qr_code = generate_qr_code_base64(monero_uri)
+            monero_uri = construct_monero_uri(subaddress, xmr_amount_with_fee)
+            # QR rendering is CPU-bound; run it on a worker thread so the event
+            # loop keeps servicing other invoices while it encodes.
+            monero_qr_code = await asyncio.to_thread(generate_qr_code_base64, monero_uri)
 
-        # Cache the generated values in the session
-        monero_invoice = {'subaddress': subaddress, 'xmr_amount_with_fee': xmr_amount_with_fee}
-        session.update({'monero_invoice': monero_invoice, 'monero_uri': monero_uri, 'monero_qr_code': monero_qr_code})
+            # Cache the generated values in the session under one key. The QR
+            # code is deliberately left out; it is regenerated from the URI.
+            monero_invoice = {'subaddress': subaddress, 'xmr_amount_with_fee': xmr_amount_with_fee}
+            session['monero_invoice_bundle'] = (monero_invoice, monero_uri)
 
-        return monero_invoice, monero_uri, monero_qr_code
+            return monero_invoice, monero_uri, monero_qr_code
 
     except Exception as e:
         logging.error(f"Error during Monero invoice generation: {e}")
@@ -58,10 +84,13 @@ def calculate_xmr_amount_with_fee(decoded_info):
     """
     amount_btc = decoded_info.get('amount_btc')
     xmr_btc_rate = decoded_info.get('xmr_btc_rate')
-    xmr_amount = Decimal(amount_btc) / Decimal(xmr_btc_rate)
-    fee_percentage = Decimal('0.05')  # Assuming a 5% processing fee
-    xmr_amount_with_fee = xmr_amount * (1 + fee_percentage)
-    return xmr_amount_with_fee.quantize(Decimal('0.000000000001'), rounding=ROUND_HALF_UP)
+    # Same fixed-point scheme as decoder.calculate_equivalent_xmr: convert the
+    # inputs to integers once and keep the hot path in int arithmetic.
+    rate_pico = int(round(float(xmr_btc_rate) * 10**12))
+    amount_sat = int((Decimal(amount_btc) * 10**8).to_integral_value(rounding=ROUND_HALF_UP))
+    xmr_atomic = amount_sat * 10**12 * 10**12 // (rate_pico * 10**8)
+    xmr_atomic_with_fee = xmr_atomic * 105 // 100  # Assuming a 5% processing fee
+    return Decimal(xmr_atomic_with_fee).scaleb(-12)
 
 async def create_monero_subaddress(rpc_url, rpc_username, rpc_password, session):
     """
@@ -83,30 +112,36 @@ async def create_monero_subaddress(rpc_url, rpc_username, rpc_password, session)
         logging.error(f"Failed to create Monero subaddress: {e}")
         return None
 
+@lru_cache(maxsize=1024)
 def generate_qr_code_base64(data):
     """
-    Generate a QR code as a base64 encoded string for the given data.
-    
+    Generate a QR code as a base64 data URI for the given data.
+
+    Output is memoized per URI, so re-rendering the same invoice (e.g. on
+    every refresh of the checking page) is a dictionary lookup.
+
+    The SVG path factory renders one XML path instead of rasterizing a PNG
+    pixel-per-module through PIL, which is considerably faster and smaller.
+
     Parameters:
     - data (str): Data to encode in the QR code.
-    
+
     Returns:
-    - str: Base64 encoded string of the generated QR code image.
+    - str: A 'data:image/svg+xml;base64,...' URI usable directly as an img src.
     """
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
         box_size=6,  # Adjust size as needed
         border=3,  # Adjust border size as needed
+        image_factory=qrcode.image.svg.SvgPathImage,
     )
     qr.add_data(data)
     qr.make(fit=True)
 
     img = qr.make_image(fill_color="black", back_color="white")
 
-    img_io = BytesIO()
-    img.save(img_io)  # Correct usage; no 'format' argument is needed
-    img_io.seek(0)
-    return base64.b64encode(img_io.getvalue()).decode('utf-8')
+    encoded = base64.b64encode(img.to_string()).decode('utf-8')
+    return f'data:image/svg+xml;base64,{encoded}'
 
 
@@ -2,75 +2,112 @@ import argparse
 import asyncio
 import json
 import logging
+import orjson
+import time
+from dataclasses import dataclass
 from decimal import Decimal
+from functools import lru_cache
 from bitcart import APIManager
 from bitcart.utils import bitcoins
 
-logging.basicConfig(level=logging.DEBUG)
-
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ChannelTotals:
+    """Summed local/remote channel balances in satoshis from one list_channels pass."""
+    local: int
+    remote: int
+
+    @property
+    def capacity(self):
+        return self.local + self.remote
+
+# Short-lived cache of channel totals per wallet so back-to-back balance and
+# liquidity queries reuse one list_channels RPC.
+CHANNEL_TOTALS_TTL_SECONDS = 5
+_channel_totals_cache = {}
+
+async def get_channel_totals(wallet):
+    """
+    Fetch the wallet's channels once and tally local and remote balances
+    in a single pass. Results are cached briefly per wallet.
+    """
+    cached = _channel_totals_cache.get(id(wallet))
+    if cached is not None and time.monotonic() - cached[1] < CHANNEL_TOTALS_TTL_SECONDS:
+        return cached[0]
+
+    channels = await wallet.list_channels()
+    local = remote = 0
+    for channel in channels:
+        local += int(channel['local_balance'])
+        remote += int(channel['remote_balance'])
+    totals = ChannelTotals(local, remote)
+    _channel_totals_cache[id(wallet)] = (totals, time.monotonic())
+    return totals
+
+@lru_cache(maxsize=1)
 def load_seed():
+    # The seed never changes while the process runs; read config.json once.
     try:
         with open('config.json') as config_file:
             config = json.load(config_file)
             seed_phrase = config.get('seed_phrase')
             if not seed_phrase:
-                logging.error("Seed phrase not found in config.json")
+                logger.error("Seed phrase not found in config.json")
                 exit()
             return seed_phrase
     except FileNotFoundError:
-        logging.error("config.json not found")
+        logger.error("config.json not found")
         exit()
     except Exception as e:
-        logging.error("Error loading seed phrase from config", exc_info=True)
+        logger.error("Error loading seed phrase from config", exc_info=True)
         exit()
 
 async def open_channel(wallet, node_id, amount):
     try:
         txid_output_index = await wallet.open_channel(node_id, amount)
-        logging.debug("Channel opened successfully!")
-        logging.debug(f"Transaction ID and Output Index: {txid_output_index}")
+        logger.debug("Channel opened successfully!")
+        logger.debug("Transaction ID and Output Index: %s", txid_output_index)
     except Exception as e:
-        logging.error("Error occurred while opening channel", exc_info=True)
+        logger.error("Error occurred while opening channel", exc_info=True)
 
 async def close_channel(wallet, channel_id):
     try:
         txid = await wallet.close_channel(channel_id)
-        logging.debug("Channel closed successfully!")
-        logging.debug(f"Transaction ID: {txid}")
+        logger.debug("Channel closed successfully!")
+        logger.debug("Transaction ID: %s", txid)
     except Exception as e:
-        logging.error("Error occurred while closing channel", exc_info=True)
+        logger.error("Error occurred while closing channel", exc_info=True)
 
 async def list_channels(wallet):
     try:
         channels = await wallet.list_channels()
-        logging.debug("List of Lightning Network Channels:")
-        for channel in channels:
-            logging.debug(channel)
+        # Skip per-channel formatting entirely unless DEBUG is actually on.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("List of Lightning Network Channels:")
+            for channel in channels:
+                logger.debug("%s", channel)
     except Exception as e:
-        logging.error("Error occurred while listing channels", exc_info=True)
+        logger.error("Error occurred while listing channels", exc_info=True)
 
 async def make_deposit(wallet, amount, description=None, expire=None):
     try:
         request_data = await wallet.add_request(amount, description, expire)
-        logging.debug("Deposit request created successfully!")
-
-        # Define a helper function to handle Decimal
-        def default(obj):
-            if isinstance(obj, Decimal):
-                return str(obj)  # Convert Decimal to string
-            raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+        logger.debug("Deposit request created successfully!")
 
-        # Extract and print only the specified fields
+        # Extract only the specified fields, normalizing Decimals up front so
+        # the serializer needs no per-value fallback callback.
         filtered_data = {
             "amount_BTC": request_data.get("amount_BTC", "Not available"),
             "address": request_data.get("address", "Not available"),
             "URI": request_data.get("URI", "Not available")
         }
+        filtered_data = {k: (str(v) if isinstance(v, Decimal) else v) for k, v in filtered_data.items()}
         print("Invoice Data (Filtered):")
-        print(json.dumps(filtered_data, indent=4, default=default))
+        print(orjson.dumps(filtered_data, option=orjson.OPT_INDENT_2).decode())
 
     except Exception as e:
-        logging.error("Error occurred while making deposit request", exc_info=True)
+        logger.error("Error occurred while making deposit request", exc_info=True)
 
 async def lnpay(wallet, invoice):
     try:
@@ -81,16 +118,16 @@ async def lnpay(wallet, invoice):
         print(f"LN Payment Response: {response}")
         
         # Logging the JSON response using logging instead of print for production usage
-        logging.debug(f"LN Payment Response: {response}")
+        logger.debug("LN Payment Response: %s", response)
         
         # Determine success from the response, assuming 'success' key indicates operation success or not
         # Adjust the key according to the actual structure of your JSON response
         success = response.get('success', False)
         
-        logging.debug("Payment successful!" if success else "Payment failed.")
+        logger.debug("Payment successful!" if success else "Payment failed.")
         return response  # Return the full response for further processing or inspection
     except Exception as e:
-        logging.error("Error occurred while paying the invoice", exc_info=True)
+        logger.error("Error occurred while paying the invoice", exc_info=True)
         # Return False, or consider returning None or an error structure for better error handling
         return {'error': str(e), 'success': False}
 
@@ -98,56 +135,61 @@ async def get_balance(wallet):
     try:
         balance_data = await wallet.balance()
         for balance_type, amount in balance_data.items():
-            logging.debug(f"{balance_type.capitalize()}: {amount} BTC")
+            logger.debug("%s: %s BTC", balance_type.capitalize(), amount)
     except Exception as e:
-        logging.error("Error occurred while retrieving balance", exc_info=True)
+        logger.error("Error occurred while retrieving balance", exc_info=True)
 
 async def get_total_balance(wallet, balance_type="local"):
     try:
-        channels = await wallet.list_channels()
+        totals = await get_channel_totals(wallet)
         if balance_type == "local":
-            total_balance = sum(int(channel['local_balance']) for channel in channels)
+            total_balance = totals.local
         elif balance_type == "remote":
-            total_balance = sum(int(channel['remote_balance']) for channel in channels)
+            total_balance = totals.remote
         elif balance_type == "both":
             # Both refers to the sum of both balances, showing overall channel capacity
-            total_balance = sum(int(channel['local_balance']) + int(channel['remote_balance']) for channel in channels)
+            total_balance = totals.capacity
         else:
-            logging.error(f"Invalid balance type: {balance_type}")
+            logger.error("Invalid balance type: %s", balance_type)
             return Decimal('0')
         return bitcoins(total_balance)
     except Exception as e:
-        logging.error("Error occurred while calculating total balance", exc_info=True)
+        logger.error("Error occurred while calculating total balance", exc_info=True)
         return Decimal('0')
 
 async def add_invoice(wallet, amount, description='', expire=15):
     try:
         invoice_data = await wallet.add_invoice(amount, description, expire)
-        logging.debug("Invoice created successfully!")
-        logging.debug(f"Invoice data: {invoice_data}")
+        logger.debug("Invoice created successfully!")
+        logger.debug("Invoice data: %s", invoice_data)
         return invoice_data
     except Exception as e:
-        logging.error("Error occurred while creating an invoice", exc_info=True)
+        logger.error("Error occurred while creating an invoice", exc_info=True)
         return {}
 
 async def calculate_send_liquidity(wallet):
+    """
+    Return the local balance as a percentage of total channel capacity
+    (a float between 0 and 100), or None if it cannot be determined.
+    """
     try:
-        channels = await wallet.list_channels()
-        total_local = sum(int(channel['local_balance']) for channel in channels)
-        total_remote = sum(int(channel['remote_balance']) for channel in channels)
-        total_capacity = total_local + total_remote
-        
-        if total_capacity > 0:
-            percentage_local = (total_local / total_capacity) * 100
-        else:
-            return "No channels or zero capacity found, cannot calculate liquidity."
-        
-        return f"Local balance as a percentage of total channel capacity: {percentage_local:.2f}%"
+        totals = await get_channel_totals(wallet)
+        if totals.capacity > 0:
+            return (totals.local / totals.capacity) * 100
+        return None
     except Exception as e:
-        logging.error("Error occurred while calculating send liquidity", exc_info=True)
-        return "Failed to calculate send liquidity."
+        logger.error("Error occurred while calculating send liquidity", exc_info=True)
+        return None
+
+async def calculate_send_liquidity_message(wallet):
+    """Human-readable wrapper around calculate_send_liquidity for CLI output."""
+    percentage_local = await calculate_send_liquidity(wallet)
+    if percentage_local is None:
+        return "No channels or zero capacity found, cannot calculate liquidity."
+    return f"Local balance as a percentage of total channel capacity: {percentage_local:.2f}%"
 
 async def main():
+    logging.basicConfig(level=logging.DEBUG)
     parser = argparse.ArgumentParser(description="Bitcart BTC Lightning Node CLI Utility")
     parser.add_argument("--open", nargs=2, metavar=("node_id", "amount"), help="Open a LN channel")
     parser.add_argument("--close", metavar="channel_id", help="Close a LN channel")
@@ -188,16 +230,21 @@ async def main():
             if 'lightning_invoice' in invoice_data:
                 print(f"Created Invoice: {invoice_data['lightning_invoice']}")
             else:
-                logging.error("Invoice data does not contain a valid invoice string.")
+                logger.error("Invoice data does not contain a valid invoice string.")
         elif args.send_liquidity:
-            liquidity_message = await calculate_send_liquidity(wallet)
+            liquidity_message = await calculate_send_liquidity_message(wallet)
             print(liquidity_message)
        
         else:
             parser.print_help()
             
     except Exception as e:
-        logging.error("A general error occurred", exc_info=True)
+        logger.error("A general error occurred", exc_info=True)
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file
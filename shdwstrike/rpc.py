@@ -0,0 +1,43 @@
+#rpc.py
+#
+# Shared aiohttp plumbing for all wallet-RPC consumers (checker, xmr,
+# sweepbot via xmr). Lives in its own module so importing the session does
+# not drag in any polling or web-app code.
+
+import aiohttp
+import orjson
+from functools import lru_cache
+
+# Module-level session shared by all RPC calls so connection pooling and
+# HTTP keep-alive apply across repeated polls of the wallet RPC.
+_session = None
+
+async def get_session():
+    """
+    Return the shared aiohttp session, creating it lazily on first use.
+
+    :return: The module-wide aiohttp.ClientSession.
+    """
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=256, limit_per_host=64,
+            use_dns_cache=True, ttl_dns_cache=300,
+            keepalive_timeout=75, enable_cleanup_closed=True)
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30, connect=5),
+            json_serialize=lambda obj: orjson.dumps(obj).decode())
+    return _session
+
+async def close_session():
+    """Close the shared session. Call once at application shutdown."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+@lru_cache(maxsize=8)
+def basic_auth(username, password):
+    """Memoized BasicAuth so the base64 header is encoded once per credential pair."""
+    return aiohttp.BasicAuth(username, password)
@@ -1,80 +1,176 @@
-from flask import Flask, render_template, request, redirect, url_for, session
+from quart import Quart, render_template, request, redirect, url_for, session
+from quart.json.provider import JSONProvider
+from quart_session import Session
+import orjson
 from datetime import datetime, timedelta
 from werkzeug.exceptions import HTTPException
+from jinja2 import FileSystemBytecodeCache
+import redis.asyncio
 import logging
+from functools import lru_cache
 from uuid import uuid4
 import asyncio
+import time
 from decimal import Decimal
 import os
+import aiofiles
+import aiofiles.os
 
 from decoder import decode_lightning_invoice
-from invoice import generate_monero_invoice
+from invoice import generate_monero_invoice, generate_qr_code_base64
 from checker import check_incoming_transfers, check_incoming_transfers_0conf
+from rpc import close_session
 from ln import lnpay, APIManager, load_seed, get_total_balance, calculate_send_liquidity
 from xmr import validate_monero_address
 
-app = Flask(__name__)
+app = Quart(__name__)
 app.secret_key = 'enter secret session key'
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson; covers jsonify and the |tojson filter."""
+
+    def dumps(self, object_, **kwargs):
+        # Decimals (invoice amounts) serialize via str, like the stdlib default.
+        return orjson.dumps(object_, default=str).decode()
+
+    def loads(self, object_, **kwargs):
+        return orjson.loads(object_)
+
+
+app.json = OrjsonProvider(app)
+
+# Server-side sessions: the browser only carries a signed session id while
+# invoice data lives in Redis, instead of reshipping (and re-HMACing) the
+# whole decoded_info blob in the cookie on every request. Entries expire on
+# their own shortly after the invoice does.
+app.config["SESSION_TYPE"] = "redis"
+app.config["SESSION_REDIS"] = redis.asyncio.Redis(host='127.0.0.1', port=6379)
+app.config["SESSION_PERMANENT"] = False
+app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(minutes=5)
+Session(app)
+
+# Persist compiled templates across restarts and pre-fetch the hot ones
+# (every error branch plus the per-poll checking page) so those paths skip
+# the template lookup entirely.
+_JINJA_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.jinja_cache')
+os.makedirs(_JINJA_CACHE_DIR, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(_JINJA_CACHE_DIR)
+_ERROR_TPL = app.jinja_env.get_template('error.html')
+_CHECKING_TPL = app.jinja_env.get_template('checking_invoice.html')
+
+# Default to WARNING in production; set SHDWSTRIKE_LOG_LEVEL=DEBUG to turn
+# the verbose session dumps back on.
+logging.basicConfig(
+    level=os.environ.get('SHDWSTRIKE_LOG_LEVEL', 'WARNING'),
+    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def _debug_enabled():
+    return logger.isEnabledFor(logging.DEBUG)
 
 #stagenet monero wallet rpc
 rpc_url = "http://127.0.0.1:38083/json_rpc"
 rpc_username = 'your_rpc_username'
 rpc_password = 'your_rpc_password'
 
+# Decimal thresholds used on every request, built once.
+MAX_INVOICE_BTC = Decimal('0.0015')
+ZERO_CONF_THRESHOLD_XMR = Decimal('0.25')
+_ZERO = Decimal(0)
+
+
+@lru_cache(maxsize=1)
+def get_wallet():
+    """Build the lightning wallet once per process instead of per request."""
+    seed_phrase = load_seed()
+    manager = APIManager({"BTC": [seed_phrase]})
+    return manager.BTC[seed_phrase]
+
+
+@app.before_serving
+async def warm_wallet():
+    # Bind the wallet (and its client session) to the serving event loop.
+    get_wallet()
+    # The invoice record directories never change; create them once here
+    # instead of on every /striking hit and expired /checking poll.
+    await ensure_directories_exist(['successful_invoices', 'refund_invoices'])
+
+
+@app.after_serving
+async def shutdown_rpc_session():
+    await close_session()
+
 
 @app.errorhandler(404)
-def error_404(error):
-    logging.debug('Session content before clearing on 404: %s', session)
-    return render_template('error.html', error_message='Page not found. Please start over.'), 404
+async def error_404(error):
+    if _debug_enabled():
+        logger.debug('Session content before clearing on 404: %s', dict(session))
+    return await render_template('error.html', error_message='Page not found. Please start over.'), 404
 
 @app.errorhandler(500)
-def error_500(error):
+async def error_500(error):
     session.clear()
-    return render_template('error.html', error_message='Internal server error. Please start over.'), 500
+    return await render_template('error.html', error_message='Internal server error. Please start over.'), 500
 
 @app.errorhandler(Exception)
-def handle_exception(error):
+async def handle_exception(error):
     session.clear()
     if isinstance(error, HTTPException):
         # Pass through HTTP errors
         return error
-    return render_template('error.html', error_message='An unexpected error has occurred. Please start over.'), 500
+    return await render_template('error.html', error_message='An unexpected error has occurred. Please start over.'), 500
 
 
 @app.route('/')
-def index():
+async def index():
     session.clear()
     session['session_id'] = str(uuid4())
-    return render_template('index.html')
+    return await render_template('index.html')
 
 @app.route('/quote', methods=['POST'])
 async def process_invoice():
-    logging.debug('Session content at the start of processing invoice: %s', session)
-    invoice = request.form.get('invoice')
-    refund_address = request.form.get('refund_address')
+    if _debug_enabled():
+        logger.debug('Session content at the start of processing invoice: %s', dict(session))
+    form = await request.form
+    invoice = form.get('invoice')
+    refund_address = form.get('refund_address')
     if not invoice or not refund_address:
-        return render_error("Missing invoice or refund address")
+        return await render_error("Missing invoice or refund address")
+
+    # Address validation and invoice decoding are independent round-trips;
+    # start both before awaiting either.
+    address_task = asyncio.ensure_future(is_valid_refund_address(refund_address))
+    decode_task = asyncio.ensure_future(decode_and_validate_invoice(invoice))
+
+    if not await address_task:
+        decode_task.cancel()
+        return await render_error("Invalid Monero refund address")
 
-    if not await is_valid_refund_address(refund_address):
-        return render_error("Invalid Monero refund address")
-    
     try:
-        decoded_info = await decode_and_validate_invoice(invoice)
+        decoded_info = await decode_task
         if not decoded_info:
-            return render_error("Decoding returned empty data.")
+            return await render_error("Decoding returned empty data.")
 
         # Prepare session data
         prepare_session(decoded_info, refund_address)
 
-        return render_template('invoice_details.html', decoded_info=decoded_info, refund_address=refund_address)
+        return await render_template('invoice_details.html', decoded_info=decoded_info, refund_address=refund_address)
     except Exception as e:
-        logging.error(f"Error processing invoice: {e}")
-        return render_error("Failed to process the invoice.")
+        logger.error("Error processing invoice: %s", e)
+        return await render_error("Failed to process the invoice.")
+
+# Address validity is deterministic for a given string; remember verdicts
+# for a while so repeat refund addresses skip the RPC round-trip.
+ADDRESS_CACHE_TTL_SECONDS = 600
+_address_cache = {}
 
 async def is_valid_refund_address(refund_address):
+    hit = _address_cache.get(refund_address)
+    if hit is not None and time.monotonic() - hit[1] < ADDRESS_CACHE_TTL_SECONDS:
+        return hit[0]
     is_valid, *_ = await validate_monero_address(refund_address)
+    _address_cache[refund_address] = (is_valid, time.monotonic())
     return is_valid
 
 async def decode_and_validate_invoice(invoice):
@@ -82,41 +178,41 @@ async def decode_and_validate_invoice(invoice):
     if not decoded_info:
         return None
 
-    seed_phrase = load_seed()  # Assuming this function is implemented elsewhere.
-    manager = APIManager({"BTC": [seed_phrase]})
-    wallet = manager.BTC[seed_phrase]
+    wallet = get_wallet()
+    amount_btc = Decimal(decoded_info['amount_btc'])
 
-    if not await has_sufficient_balance(decoded_info['amount_btc'], wallet):
+    # Balance and liquidity are independent wallet RPCs; fetch them together.
+    local_balance, spend_liquidity_percentage = await asyncio.gather(
+        get_total_balance(wallet, "local"),
+        calculate_send_liquidity(wallet))
+
+    if not has_sufficient_balance(amount_btc, local_balance):
         raise ValueError("Insufficient wallet balance for this invoice.")
 
-    if not await is_liquidity_sufficient(wallet):
+    if not is_liquidity_sufficient(spend_liquidity_percentage):
         raise ValueError("Total spend liquidity is below 10%.")
 
-    if Decimal(decoded_info['amount_btc']) > Decimal('0.0015'):
+    if amount_btc > MAX_INVOICE_BTC:
         raise ValueError("Decoded amount is greater than 0.0015 BTC.")
 
     return decoded_info
 
-async def has_sufficient_balance(amount_btc, wallet):
-    local_balance = await get_total_balance(wallet, "local")
-    return Decimal(amount_btc) <= local_balance
+def has_sufficient_balance(amount_btc, local_balance):
+    return amount_btc <= local_balance
 
-async def is_liquidity_sufficient(wallet):
-    spend_liquidity_message = await calculate_send_liquidity(wallet)
-    if "percentage" in spend_liquidity_message:
-        spend_liquidity_percentage = float(spend_liquidity_message.split(":")[-1].strip().replace("%", ""))
-        return spend_liquidity_percentage >= 10
-    return False
+def is_liquidity_sufficient(spend_liquidity_percentage):
+    return spend_liquidity_percentage is not None and spend_liquidity_percentage >= 10
 
 def prepare_session(decoded_info, refund_address):
     decoded_info['invoice_lines'] = [decoded_info['invoice']]
     session['decoded_info'] = decoded_info
     session['refund_address'] = refund_address
-    session['invoice_expiry'] = (datetime.utcnow() + timedelta(minutes=2)).isoformat()
-    logging.debug('Session content after setting decoded_info: %s', session)
+    session['invoice_expiry_ts'] = time.time() + 120
+    if _debug_enabled():
+        logger.debug('Session content after setting decoded_info: %s', dict(session))
 
-def render_error(error_message):
-    return render_template('error.html', error_message=error_message), 400
+async def render_error(error_message, status=400):
+    return await _ERROR_TPL.render_async(error_message=error_message), status
 
 @app.route('/invoice', methods=['POST'])
 async def accept_rate():
@@ -127,14 +223,15 @@ async def accept_rate():
         monero_details = await generate_and_validate_monero_details(decoded_info)
         update_session_with_monero_details(monero_details)
 
-        return render_monero_invoice(monero_details)
+        return await render_monero_invoice(monero_details)
     except Exception as e:
-        logging.error(f"Operation failed: {e}")
-        return render_error(f"Failed to complete operation: {e}")
+        logger.error("Operation failed: %s", e)
+        return await render_error(f"Failed to complete operation: {e}", status=500)
 
 
 def get_decoded_info_from_session():
-    logging.debug('Session content before accessing decoded_info: %s', session)
+    if _debug_enabled():
+        logger.debug('Session content before accessing decoded_info: %s', dict(session))
     decoded_info = session.get('decoded_info', {})
     if not decoded_info:
         raise ValueError("No LN invoice found in session.")
@@ -162,151 +259,162 @@ async def generate_and_validate_monero_details(decoded_info):
 
 
 def update_session_with_monero_details(monero_details):
-    session.update(monero_details)
+    # The QR code is regenerated on demand from the URI (the renderer is
+    # memoized), so there is no need to persist it per session.
+    session.update({k: v for k, v in monero_details.items() if k != 'monero_qr_code'})
+
 
+async def render_monero_invoice(monero_details):
+    return await render_template('monero_invoice.html', monero_invoice=monero_details['monero_invoice'], monero_uri=monero_details['monero_uri'], monero_qr_code=monero_details['monero_qr_code'], requested_amount=monero_details['requested_amount'])
 
-def render_monero_invoice(monero_details):
-    return render_template('monero_invoice.html', monero_invoice=monero_details['monero_invoice'], monero_uri=monero_details['monero_uri'], monero_qr_code=monero_details['monero_qr_code'], requested_amount=monero_details['requested_amount'])
 
 
-def render_error(error_message):
-    return render_template('error.html', error_message=error_message), 500
+# Long-poll tuning for /checking: the handler holds the request open and
+# re-checks server-side instead of the client reloading once per check.
+LONG_POLL_WINDOW_SECONDS = 20
+LONG_POLL_INTERVAL_SECONDS = 2
 
 
 @app.route('/checking', methods=['GET'])
 async def i_have_paid():
-    logging.debug("Starting to process the payment checking...")
-
-    invoice_expiry_str = session.get('invoice_expiry')
-    if not invoice_expiry_str:
-        return log_and_render_error("Invoice expiry time missing from the session.", 400)
-    
-    if is_invoice_expired(invoice_expiry_str):
-        return log_and_render_error("Invoice has expired.", 410)
+    logger.debug("Starting to process the payment checking...")
 
-    update_remaining_time(invoice_expiry_str)
+    invoice_expiry_ts = session.get('invoice_expiry_ts')
+    if not invoice_expiry_ts:
+        return await log_and_render_error("Invoice expiry time missing from the session.", 400)
 
     subaddress_index, requested_amount = get_payment_details()
-    payment_info = await determine_and_check_transfer(subaddress_index, requested_amount)
-    update_session_with_payment_info(payment_info)
 
-    logging.debug(f"Payment received status: {session.get('payment_received')}")
-    
-    if session['payment_received']:
-        logging.debug("Redirecting to the 'striking' route as payment is received...")
-        return redirect(url_for('striking'))
+    if await is_invoice_expired(invoice_expiry_ts, subaddress_index):
+        return await log_and_render_error("Invoice has expired.", 410)
+
+    # Long-poll: keep checking for up to LONG_POLL_WINDOW_SECONDS before
+    # answering, so each page load covers many transfer checks instead of
+    # the browser issuing one request per check.
+    deadline = time.monotonic() + LONG_POLL_WINDOW_SECONDS
+    while True:
+        payment_info = await determine_and_check_transfer(subaddress_index, requested_amount)
+        if 'error' in payment_info:
+            # Fail fast like the single-shot check did; re-polling a failing
+            # RPC every interval for the whole window helps nobody.
+            logger.error("Transfer check failed: %s", payment_info['error'])
+            break
+        update_session_with_payment_info(payment_info)
 
-    return render_template_with_details()
+        if session['payment_received']:
+            logger.debug("Redirecting to the 'striking' route as payment is received...")
+            return redirect(url_for('striking'))
 
+        if time.monotonic() >= deadline or await is_invoice_expired(invoice_expiry_ts, subaddress_index):
+            break
+        await asyncio.sleep(LONG_POLL_INTERVAL_SECONDS)
 
-def log_and_render_error(message, status_code):
-    logging.error(message)
-    return render_template('error.html', error_message=message), status_code
+    if await is_invoice_expired(invoice_expiry_ts, subaddress_index):
+        return await log_and_render_error("Invoice has expired.", 410)
 
+    update_remaining_time(invoice_expiry_ts)
+    logger.debug("Payment received status: %s", session.get('payment_received'))
+    return await render_template_with_details()
 
-def is_invoice_expired(invoice_expiry_str):
-    invoice_expiry = datetime.fromisoformat(invoice_expiry_str)
-    now_utc = datetime.utcnow()
-    logging.debug(f"Comparing current time {now_utc} with invoice expiry {invoice_expiry}")
-    expired = now_utc > invoice_expiry
+
+async def log_and_render_error(message, status_code):
+    logger.error(message)
+    return await _ERROR_TPL.render_async(error_message=message), status_code
+
+
+async def is_invoice_expired(invoice_expiry_ts, subaddress_index):
+    # Expiry is a plain unix timestamp; no datetime parsing per poll.
+    expired = time.time() > invoice_expiry_ts
     if expired:
-        subaddress_index, _ = get_payment_details()
         balance = session.get('balance', '0')
-        if Decimal(balance) > Decimal('0'):
-            logging.debug("Invoice expired but balance exists. Recording details...")
-            record_payment_details_on_expiry(subaddress_index)
+        if Decimal(balance) > _ZERO:
+            logger.debug("Invoice expired but balance exists. Recording details...")
+            await record_payment_details_on_expiry(subaddress_index)
     return expired
 
-def record_payment_details_on_expiry(subaddress_index):
+async def record_payment_details_on_expiry(subaddress_index):
     user_session_id = session.get('session_id')
     refund_address = session.get('refund_address')
     file_directory = 'refund_invoices'
-    
-    # Ensure the directory exists
-    os.makedirs(file_directory, exist_ok=True)
-    
+
     file_path = os.path.join(file_directory, f"{user_session_id}.txt")
-    with open(file_path, 'w') as file:
-        file.write(f"Subaddress Index: {subaddress_index}\n")
-        file.write(f"Target Address: {refund_address}\n")
-        
-    logging.debug("Payment details recorded for expired invoice with balance.")
+    # Write to a sibling tmp file and rename into place: sweepbot scans this
+    # folder concurrently and a torn read would count against its error budget.
+    tmp_path = file_path + '.tmp'
+    async with aiofiles.open(tmp_path, 'w') as file:
+        await file.write(f"Subaddress Index: {subaddress_index}\n")
+        await file.write(f"Target Address: {refund_address}\n")
+    await aiofiles.os.replace(tmp_path, file_path)
+
+    logger.debug("Payment details recorded for expired invoice with balance.")
 
 
-def update_remaining_time(invoice_expiry_str):
-    invoice_expiry = datetime.fromisoformat(invoice_expiry_str)
-    now_utc = datetime.utcnow()
-    time_left_seconds = (invoice_expiry - now_utc).total_seconds()
-    session['remaining_minutes'] = int(time_left_seconds // 60)
-    session['remaining_seconds'] = int(time_left_seconds % 60)
-    logging.debug(f"Time left: {session['remaining_minutes']} minutes, {session['remaining_seconds']} seconds")
+def update_remaining_time(invoice_expiry_ts):
+    time_left_seconds = int(invoice_expiry_ts - time.time())
+    session['remaining_minutes'], session['remaining_seconds'] = divmod(max(time_left_seconds, 0), 60)
+    logger.debug("Time left: %d minutes, %d seconds", session['remaining_minutes'], session['remaining_seconds'])
 
 
 def get_payment_details():
     subaddress_index = session.get('subaddress_index', '')
     requested_amount = Decimal(session.get('requested_amount', '0'))
-    logging.debug(f"Subaddress index: {subaddress_index}, Requested amount: {requested_amount}")
+    logger.debug("Subaddress index: %s, Requested amount: %s", subaddress_index, requested_amount)
     return subaddress_index, requested_amount
 
 
 async def determine_and_check_transfer(subaddress_index, requested_amount):
     # Determine which function to call based on the requested amount
-    transfer_checker = check_incoming_transfers_0conf if requested_amount < Decimal('0.25') else check_incoming_transfers
-    return await transfer_checker(subaddress_index, rpc_url, rpc_username, rpc_password, requested_amount)
+    transfer_checker = check_incoming_transfers_0conf if requested_amount < ZERO_CONF_THRESHOLD_XMR else check_incoming_transfers
+    min_height = session.get('invoice_creation_height', 0)
+    return await transfer_checker(subaddress_index, rpc_url, rpc_username, rpc_password, requested_amount, min_height=min_height)
 
 
 def update_session_with_payment_info(payment_info):
     session['payment_received'] = payment_info.get('payment_received', False)
-    
+
+    # The checker already reports plain numbers; format directly instead of
+    # round-tripping through Decimal.
     valid_total_amount_received_xmr = payment_info.get('valid_total_amount_received_xmr', 0)
-    pending_amount_received_xmr = payment_info.get('pending_amount_received_xmr', 0)
-    
-    valid_total_amount_xmr = Decimal(valid_total_amount_received_xmr)
-    pending_amount_xmr = Decimal(pending_amount_received_xmr)
-    
-    balance_xmr = valid_total_amount_xmr
-    session['balance'] = "{:.12f}".format(balance_xmr)  # Store the new balance in the session.
+    session['balance'] = "{:.12f}".format(valid_total_amount_received_xmr)  # Store the new balance in the session.
 
 
-def render_template_with_details():
-    return render_template(
-        'checking_invoice.html',
+async def render_template_with_details():
+    monero_uri = session.get('monero_uri', '')
+    return await _CHECKING_TPL.render_async(
         remaining_minutes=session['remaining_minutes'],
         remaining_seconds=session['remaining_seconds'],
         monero_invoice=session.get('monero_invoice', {}),
-        monero_qr_code=session.get('monero_qr_code', ''),
-        monero_uri=session.get('monero_uri', ''),
+        monero_qr_code=generate_qr_code_base64(monero_uri) if monero_uri else '',
+        monero_uri=monero_uri,
         balance=session.get('balance', 'N/A')
-    
+
     )
 
     
 
 @app.route('/striking')
 async def striking():
-    ensure_directories_exist(['successful_invoices', 'refund_invoices'])
-
     if not payment_received():
-        return render_template('error.html', error_message="No Monero payment received to trigger LN payment."), 400
+        return await render_template('error.html', error_message="No Monero payment received to trigger LN payment."), 400
 
     ln_invoice = get_ln_invoice_from_session()
     if not ln_invoice:
-        return render_template('error.html', error_message="LN invoice not found in session."), 404
+        return await render_template('error.html', error_message="LN invoice not found in session."), 404
 
     try:
         payment_response = await process_ln_payment(ln_invoice)
         is_payment_successful = payment_response.get('success', False)
         
-        record_payment_details(is_payment_successful)
-        return payment_response_page(is_payment_successful)
+        await record_payment_details(is_payment_successful)
+        return await payment_response_page(is_payment_successful)
 
     except Exception as e:
-        logging.error(f"Error during LN payment: {e}")
-        return render_template('error.html', error_message="An error occurred during LN payment. Refund in que."), 500
+        logger.error("Error during LN payment: %s", e)
+        return await render_template('error.html', error_message="An error occurred during LN payment. Refund in que."), 500
 
-def ensure_directories_exist(directories):
+async def ensure_directories_exist(directories):
     for directory in directories:
-        os.makedirs(directory, exist_ok=True)
+        await aiofiles.os.makedirs(directory, exist_ok=True)
 
 def payment_received():
     return session.get('payment_received', False)
@@ -315,20 +423,20 @@ def get_ln_invoice_from_session():
     return session.get('decoded_info', {}).get('invoice')
 
 async def process_ln_payment(ln_invoice):
-    seed_phrase = load_seed()
-    manager = APIManager({"BTC": [seed_phrase]})
-    wallet = manager.BTC[seed_phrase]
-    return await lnpay(wallet, ln_invoice)  # Assuming lnpay is an async function
+    return await lnpay(get_wallet(), ln_invoice)  # Assuming lnpay is an async function
 
-def record_payment_details(payment_success):
+async def record_payment_details(payment_success):
     user_session_id = session.get('session_id')
     subaddress_index = session.get('subaddress_index')
     target_address, file_directory = determine_payment_details_dir_and_target(payment_success)
 
     file_path = os.path.join(file_directory, f"{user_session_id}.txt")
-    with open(file_path, 'w') as file:
-        file.write(f"Subaddress Index: {subaddress_index}\n")
-        file.write(f"Target Address: {target_address}\n")
+    # Same tmp-then-replace dance as on expiry, for the same torn-read reason.
+    tmp_path = file_path + '.tmp'
+    async with aiofiles.open(tmp_path, 'w') as file:
+        await file.write(f"Subaddress Index: {subaddress_index}\n")
+        await file.write(f"Target Address: {target_address}\n")
+    await aiofiles.os.replace(tmp_path, file_path)
 
 def determine_payment_details_dir_and_target(payment_success):
     if payment_success:
@@ -339,13 +447,17 @@ def determine_payment_details_dir_and_target(payment_success):
         directory = 'refund_invoices'
     return target_address, directory
 
-def payment_response_page(payment_success):
+async def payment_response_page(payment_success):
     if payment_success:
         session.clear()  # Clear session data on successful payment
-        return render_template('paid_invoice.html')
+        return await render_template('paid_invoice.html')
     else:
-        return render_template('error.html', error_message="Failed to process LN payment. Refund in queue."), 500
+        return await render_template('error.html', error_message="Failed to process LN payment. Refund in queue."), 500
 
 if __name__ == '__main__':
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
 
-    app.run(port=5555, debug=True)
+    # Hypercorn runs all handlers on one shared event loop, so the async
+    # views and asyncio.gather calls actually overlap their I/O.
+    asyncio.run(serve(app, Config.from_mapping(bind=["127.0.0.1:5555"])))
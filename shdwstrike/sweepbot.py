@@ -1,8 +1,13 @@
 import os
 import asyncio
+import json
 import logging
+import time
+import aiofiles
+import aiofiles.os
 from datetime import datetime, timedelta
 from logging.handlers import RotatingFileHandler
+from watchfiles import awatch
 from xmr import check_unlocked, sweep_subaddress  # Ensure your 'xmr' module is correctly imported.
 
 # Configure Logging
@@ -23,6 +28,11 @@ def setup_logging():
 
 logger = setup_logging()
 
+def ensure_scan_folders(folders):
+    """Create the scan folders once at startup; they never change after."""
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+
 # Application Configuration
 CONFIG = {
     'folders_to_scan': ['/root/app4/refund_invoices', '/root/app4/successful_invoices'],
@@ -30,22 +40,68 @@ CONFIG = {
     'rpc_username': 'your_rpc_username',
     'rpc_password': 'your_rpc_password',
     'sweep_interval_hours': 1,  # Interval between subsequent sweeps per subaddress
-    'sleep_interval': 20 * 60,  # Interval between full folder scans.
+    'rescan_interval': 60 * 60,  # Safety-net interval between full folder scans.
     'max_errors': 10
 }
 
 # Globals
 error_count = 0
-last_sweep_attempt = {}
+
+# Set once the error budget is exhausted; stops the watcher and the rescan
+# loop so scan_and_sweep can actually terminate.
+_shutdown_event = asyncio.Event()
+
+# Per-subaddress sweep throttle state, persisted so restarts keep honoring
+# the hourly limit instead of re-hammering the RPC for every file on boot.
+LAST_SWEEP_FILE = '.last_sweep.json'
+
+def load_last_sweep_attempts():
+    try:
+        with open(LAST_SWEEP_FILE) as f:
+            return {int(k): datetime.fromisoformat(v) for k, v in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Could not load {LAST_SWEEP_FILE}: {e}")
+        return {}
+
+_last_sweep_write_lock = asyncio.Lock()
+
+async def save_last_sweep_attempts():
+    # Concurrent process_file tasks call this; serialize writers and rename a
+    # tmp sibling into place so a crash mid-write cannot corrupt the file.
+    serialized = json.dumps({str(k): v.isoformat() for k, v in last_sweep_attempt.items()})
+    async with _last_sweep_write_lock:
+        tmp_path = LAST_SWEEP_FILE + '.tmp'
+        async with aiofiles.open(tmp_path, 'w') as f:
+            await f.write(serialized)
+        await aiofiles.os.replace(tmp_path, LAST_SWEEP_FILE)
+
+last_sweep_attempt = load_last_sweep_attempts()
+
+# Short-lived cache of check_unlocked results per subaddress. Two files can
+# share a subaddress (refund + successful), and back-to-back scans re-ask the
+# RPC about indices that cannot have unlocked yet; one Monero block time is a
+# safe staleness bound.
+UNLOCKED_CACHE_TTL_SECONDS = 120
+_unlocked_cache = {}
+
+# Bound concurrent sweeps: wallet-rpc serializes commands internally, so more
+# in-flight RPCs than this just queue up and risk timeouts.
+SWEEP_SEM = asyncio.Semaphore(8)
 
 async def process_file(file_path):
     """
     Processes a single file, attempting to sweep if conditions are met.
     """
+    async with SWEEP_SEM:
+        await _process_file_inner(file_path)
+
+async def _process_file_inner(file_path):
     global error_count
     try:
-        with open(file_path, 'r') as file:
-            content = file.read().strip().split('\n')
+        async with aiofiles.open(file_path, 'r') as file:
+            content = (await file.read()).strip().split('\n')
 
         if len(content) < 2:
             logger.warning(f"Insufficient content in {file_path}. Skipping.")
@@ -62,12 +118,14 @@ async def process_file(file_path):
         # Attempt to sweep
         await handle_sweep(subaddress_index, target_address, file_path)
         last_sweep_attempt[subaddress_index] = now  # Update the last attempt time.
+        await save_last_sweep_attempts()
 
     except Exception as e:
         logger.error(f"Error while processing file {file_path}: {e}")
         error_count += 1
         if error_count >= CONFIG['max_errors']:
             logger.critical(f"Max errors reached: {error_count}. Exiting.")
+            _shutdown_event.set()
             raise
 
 def parse_file_content(content):
@@ -82,27 +140,70 @@ async def handle_sweep(subaddress_index, target_address, file_path):
     """
     Handles the logic to sweep a subaddress if funds are unlocked.
     """
-    unlocked, blocks_to_unlock = await check_unlocked(subaddress_index, CONFIG['rpc_url'], CONFIG['rpc_username'], CONFIG['rpc_password'])
+    now = time.monotonic()
+    cached = _unlocked_cache.get(subaddress_index)
+    if cached is not None and now - cached[1] < UNLOCKED_CACHE_TTL_SECONDS:
+        unlocked, blocks_to_unlock = cached[0]
+    else:
+        unlocked, blocks_to_unlock = await check_unlocked(subaddress_index, CONFIG['rpc_url'], CONFIG['rpc_username'], CONFIG['rpc_password'])
+        _unlocked_cache[subaddress_index] = ((unlocked, blocks_to_unlock), now)
     if unlocked:
         logger.info(f"Sweeping funds from subaddress index {subaddress_index} to {target_address}.")
         await sweep_subaddress(subaddress_index, target_address, CONFIG['rpc_url'], CONFIG['rpc_username'], CONFIG['rpc_password'])
-        os.remove(file_path)  # Remove processed file
+        _unlocked_cache.pop(subaddress_index, None)  # Balance changed; drop the stale verdict.
+        await aiofiles.os.remove(file_path)  # Remove processed file
     else:
         logger.info(f"Funds still locked for subaddress index {subaddress_index}. Blocks to unlock: {blocks_to_unlock}")
 
+# Strong references to in-flight watcher tasks; a bare ensure_future result
+# can be garbage-collected mid-flight and its exception never retrieved.
+_watch_tasks = set()
+
+def _reap_watch_task(task):
+    _watch_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Watcher task failed: {task.exception()}")
+
+async def watch_and_sweep():
+    """
+    React to filesystem events on the invoice folders instead of polling.
+
+    New .txt files are processed within seconds of being written. Files whose
+    sweep is deferred (funds locked, rate limit) are picked up again by the
+    periodic full rescan in full_rescan_loop. The watcher stops once the
+    error budget is exhausted, like the rescan loop.
+    """
+    async for changes in awatch(*CONFIG['folders_to_scan'], stop_event=_shutdown_event):
+        if error_count >= CONFIG['max_errors']:
+            break
+        # One batch can report several change types for the same file (added
+        # plus modified from a non-atomic writer); process each path once or
+        # the duplicate task double-sweeps and trips on the removed file.
+        for path in {p for _, p in changes}:
+            if path.endswith('.txt') and os.path.isfile(path):
+                task = asyncio.ensure_future(process_file(path))
+                _watch_tasks.add(task)
+                task.add_done_callback(_reap_watch_task)
+
+async def full_rescan_loop():
+    """
+    Slow safety-net scan catching files whose events were missed and files
+    skipped earlier because their funds were still locked.
+    """
+    while error_count < CONFIG['max_errors']:
+        for folder in CONFIG['folders_to_scan']:
+            await process_folder(folder)
+        logger.debug(f"Sleeping for {CONFIG['rescan_interval']} seconds before next full scan.")
+        await asyncio.sleep(CONFIG['rescan_interval'])
+    _shutdown_event.set()
+
 async def scan_and_sweep():
     """
-    Main loop for scanning folders and attempting sweeps.
+    Main entry point: one event-driven watcher plus the periodic rescan.
     """
     global error_count
     try:
-        while error_count < CONFIG['max_errors']:
-            for folder in CONFIG['folders_to_scan']:
-                await process_folder(folder)
-                
-            logger.debug(f"Sleeping for {CONFIG['sleep_interval']} seconds before next scan.")
-            await asyncio.sleep(CONFIG['sleep_interval'])
-
+        await asyncio.gather(watch_and_sweep(), full_rescan_loop())
     except Exception as e:
         logger.error(f"Critical error in scan_and_sweep: {e}")
         error_count += 1
@@ -113,7 +214,17 @@ async def process_folder(folder):
     """
     Processes each file within a specified folder.
     """
-    files = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.txt')]
+    # scandir fuses the listing with the type check (one syscall per dirent)
+    # and lets us skip files written within the last minute: their subaddress
+    # is still inside the sweep rate limit anyway.
+    now = time.time()
+    with os.scandir(folder) as entries:
+        files = [
+            entry.path for entry in entries
+            if entry.name.endswith('.txt')
+            and entry.is_file(follow_symlinks=False)
+            and now - entry.stat().st_mtime > 60
+        ]
     if not files:
         logger.debug(f"No files found in {folder}.")
         return
@@ -122,5 +233,11 @@ async def process_folder(folder):
     await asyncio.gather(*(process_file(f) for f in files))
 
 if __name__ == '__main__':
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     logger.info("Starting sweep bot...")
+    ensure_scan_folders(CONFIG['folders_to_scan'])
     asyncio.run(scan_and_sweep())
\ No newline at end of file
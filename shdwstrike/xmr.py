@@ -3,8 +3,66 @@
 import asyncio
 import aiohttp
 import logging
-from decimal import Decimal
-import requests
+import orjson
+import re
+
+# One shared connection pool for all wallet-RPC traffic, owned by the neutral
+# rpc module so importing it carries no polling or web-app side effects.
+from rpc import get_session, basic_auth
+
+log = logging.getLogger(__name__)
+
+# Transient failures (connect errors, timeouts) are retried this many times
+# with exponential backoff before the error propagates to the caller.
+_RPC_RETRIES = 3
+
+# Static payload parts built once; _rpc and the callers shallow-merge the
+# per-call fields in, same scheme as checker.py's get_transfers templates.
+_BASE_RPC = {"jsonrpc": "2.0", "id": "0"}
+_CREATE_ADDRESS_PARAMS = {"account_index": 0, "count": 1}
+_GET_BALANCE_PARAMS = {"account_index": 0}  # Assuming we're only dealing with the primary account
+_SWEEP_ALL_PARAMS = {
+    "account_index": 0,  # Assuming operation is performed within the primary account.
+    "get_tx_keys": True  # Requesting transaction keys for accountability.
+}
+
+# Cheap syntactic pre-check for Monero addresses: base58 alphabet and
+# plausible length (95 for standard/subaddresses, 106 for integrated).
+# Deliberately prefix-agnostic so mainnet, testnet and stagenet addresses
+# all pass; the daemon stays the authority on network prefix, checksum and
+# openalias for everything that matches.
+_ADDR_RE = re.compile(r'^[1-9A-HJ-NP-Za-km-z]{95,106}$')
+
+async def _rpc(url, auth, method, params=None, retries=_RPC_RETRIES):
+    """
+    Post one JSON-RPC call over the shared session and unwrap its result.
+
+    The shared session enforces connect and total timeouts, so a hung daemon
+    cannot stall a caller indefinitely. Only connection-level failures are
+    retried with backoff; an HTTP error status is deterministic (bad auth,
+    wrong endpoint) and raises aiohttp's ClientResponseError immediately.
+    Raises ValueError with the daemon's message on an RPC-level error; result
+    shaping stays in the callers. Non-idempotent methods should pass
+    retries=1 so a request that may already have been applied is never
+    resent blindly.
+    """
+    payload = {**_BASE_RPC, "method": method}
+    if params is not None:
+        payload["params"] = params
+    session = await get_session()
+    for attempt in range(retries):
+        try:
+            async with session.post(url, json=payload, auth=auth) as response:
+                response.raise_for_status()
+                body = orjson.loads(await response.read())
+            break
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == retries - 1:
+                raise
+            await asyncio.sleep(0.2 * 2 ** attempt)
+    if 'error' in body:
+        raise ValueError(body['error']['message'])
+    return body.get('result', {})
 
 
 def construct_monero_uri(subaddress, xmr_amount_with_fee=None):
@@ -38,103 +96,108 @@ async def create_monero_address(rpc_url, rpc_username, rpc_password):
     Raises:
         ValueError: If the RPC call fails or returns an unexpected result.
     """
-    payload_create_address = {
-        "jsonrpc": "2.0",
-        "id": "0",
-        "method": "create_address",
-        "params": {"account_index": 0, "count": 1}
-    }
-
-    headers = {'Content-Type': 'application/json'}
-    auth = aiohttp.BasicAuth(rpc_username, rpc_password)
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(rpc_url, json=payload_create_address, headers=headers, auth=auth) as response:
-            if response.status == 200:
-                response_json = await response.json()
-                if not response_json:
-                    raise ValueError("Error: Empty JSON response received.")
-                
-                result = response_json.get('result', {})
-                subaddress = result.get('addresses', [''])[0]
-                subaddress_index = result.get('address_index', -1)
-                if not subaddress:
-                    raise ValueError("Error: Empty subaddress received.")
-                return subaddress, subaddress_index
-            else:
-                logging.error(f"Error creating Monero address: HTTP status {response.status}")
-                logging.error(await response.text())
-                raise ValueError(f"Error creating Monero address: HTTP status {response.status}")
+    result = await _rpc(rpc_url, basic_auth(rpc_username, rpc_password),
+                        "create_address", _CREATE_ADDRESS_PARAMS)
+    subaddress = result.get('addresses', [''])[0]
+    subaddress_index = result.get('address_index', -1)
+    if not subaddress:
+        raise ValueError("Error: Empty subaddress received.")
+    return subaddress, subaddress_index
+
+
+
+
+async def get_wallet_height(rpc_url, rpc_username, rpc_password):
+    """
+    Asynchronously fetches the wallet's current blockchain height.
+
+    Used to pin the creation height of an invoice so later polls can ask the
+    daemon only for transfers at or above that height.
 
+    Args:
+        rpc_url (str): The URL of the Monero RPC interface.
+        rpc_username (str): The RPC username for authentication.
+        rpc_password (str): The RPC password for authentication.
+
+    Returns:
+        int: The current wallet height, or 0 if it could not be retrieved.
+    """
+    try:
+        result = await _rpc(rpc_url, basic_auth(rpc_username, rpc_password), "get_height")
+        return result.get('height', 0)
+    except Exception as e:
+        log.error("Exception fetching wallet height: %s", e)
+        return 0
+
+
+async def check_unlocked_many(subaddress_indices, rpc_url, rpc_username, rpc_password):
+    """
+    Asynchronously checks unlocked funds for several subaddresses with one RPC.
 
+    get_balance accepts a list of address_indices and is the documented hot
+    path of the wallet RPC, so one batched call replaces one call per index.
+
+    Args:
+        subaddress_indices (list[int]): Indices of the subaddresses to check.
+        rpc_url (str): URL to the Monero daemon's JSON RPC interface.
+        rpc_username (str): The RPC username for authentication.
+        rpc_password (str): The RPC password for authentication.
+
+    Returns:
+        dict: Mapping of subaddress index to a 2-tuple of (has unlocked funds,
+              blocks until unlock). Indices missing from the response map to
+              (False, 0), as does every index when the call fails.
+    """
+    try:
+        result_get_balance = await _rpc(
+            rpc_url, basic_auth(rpc_username, rpc_password), "get_balance",
+            {**_GET_BALANCE_PARAMS, "address_indices": list(subaddress_indices)})
+
+        # Demux the per_subaddress array into one entry per requested index.
+        per_subaddress = {subaddr.get('address_index'): subaddr
+                          for subaddr in result_get_balance.get('per_subaddress', [])}
+
+        results = {}
+        for index in subaddress_indices:
+            subaddress_info = per_subaddress.get(index)
+            if subaddress_info:
+                # Only truthiness is needed, so compare the raw atomic
+                # amount instead of converting it to XMR.
+                raw_unlocked = int(subaddress_info.get('unlocked_balance', 0))
+                blocks_to_unlock = subaddress_info.get('blocks_to_unlock', 0)
+                results[index] = (raw_unlocked > 0, blocks_to_unlock)
+            else:
+                # If no specific subaddress information was found, log an error
+                log.error("Subaddress info not found for index %s.", index)
+                results[index] = (False, 0)
+        return results
+
+    except Exception as e:
+        # Log any unexpected exceptions during execution
+        log.error("Exception checking if funds are unlocked: %s", e)
+        return {index: (False, 0) for index in subaddress_indices}
 
 
 async def check_unlocked(subaddress_index, rpc_url, rpc_username, rpc_password):
     """
     Asynchronously checks if there are unlocked funds in a specific Monero subaddress.
-    
-    This function sends a request to a Monero daemon's JSON RPC interface to query the balance
-    and unlocked balance of the given subaddress index within the primary account. It reports
-    the current balance, unlocked balance, and how many blocks are needed until the next
-    balance unlock, if applicable.
-    
+
+    Thin single-index wrapper around check_unlocked_many; callers tracking
+    several subaddresses should use the batched version directly.
+
     Args:
         subaddress_index (int): Index of the subaddress within the account to be checked.
         rpc_url (str): URL to the Monero daemon's JSON RPC interface.
         rpc_username (str): The RPC username for authentication.
         rpc_password (str): The RPC password for authentication.
-    
+
     Returns:
         tuple: A 2-tuple where the first element is a boolean indicating if there are unlocked funds,
                and the second element is the number of blocks until the funds are unlocked (0 if already unlocked).
                In the event of an error, it returns (False, 0).
     """
-    try:
-        # Constructing the payload for the RPC request
-        payload_get_balance = {
-            "jsonrpc": "2.0",
-            "id": "0",
-            "method": "get_balance",
-            "params": {
-                "account_index": 0,  # Assuming we're only dealing with the primary account
-                "address_indices": [subaddress_index]
-            }
-        }
-
-        # Using aiohttp ClientSession for the asynchronous POST request
-        async with aiohttp.ClientSession() as session:
-            async with session.post(rpc_url, json=payload_get_balance,
-                                    auth=aiohttp.BasicAuth(rpc_username, rpc_password)) as response_get_balance:
-                response_data = await response_get_balance.json()
-                
-                if 'error' in response_data:
-                    # If there's an error in the response, log it and raise an exception
-                    message = response_data['error']['message']
-                    logging.error(f"RPC error getting balance: {message}")
-                    raise ValueError(f"RPC Error getting balance: {message}")
-                
-                # Extracting balance information from the response
-                result_get_balance = response_data.get('result', {})
-                subaddress_info = next((subaddr for subaddr in result_get_balance.get('per_subaddress', []) 
-                                        if subaddr.get('address_index') == subaddress_index), None)
-
-                if subaddress_info:
-                    # Convert the balance and unlocked balance from atomic units to XMR
-                    balance = Decimal(subaddress_info.get('balance', 0)) / Decimal(10**12)
-                    unlocked_balance = Decimal(subaddress_info.get('unlocked_balance', 0)) / Decimal(10**12)
-                    blocks_to_unlock = subaddress_info.get('blocks_to_unlock', 0)
-                    
-                    
-                    return unlocked_balance > 0, blocks_to_unlock
-                else:
-                    # If no specific subaddress information was found, log an error
-                    logging.error("Subaddress info not found.")
-                    return False, 0
-    
-    except Exception as e:
-        # Log any unexpected exceptions during execution
-        logging.error(f"Exception checking if funds are unlocked: {e}")
-        return False, 0
+    results = await check_unlocked_many([subaddress_index], rpc_url, rpc_username, rpc_password)
+    return results[subaddress_index]
 
 
 async def sweep_subaddress(subaddress_index, target_address,
@@ -160,43 +223,29 @@ async def sweep_subaddress(subaddress_index, target_address,
         Logs information on the outcome of the sweep operation, including transaction hashes
         if the operation was successful, or an error message if unsuccessful.
     """
-    # Construct the payload for the "sweep_all" RPC method.
-    payload_sweep = {
-        "jsonrpc": "2.0",
-        "id": "0",
-        "method": "sweep_all",
-        "params": {
-            "address": target_address,
-            "account_index": 0,  # Assuming operation is performed within the primary account.
-            "subaddr_indices": [subaddress_index],
-            "get_tx_keys": True  # Requesting transaction keys for accountability.
-        }
-    }
-
     try:
-        # Execute the asynchronous RPC request.
-        async with aiohttp.ClientSession() as session:
-            async with session.post(rpc_url, json=payload_sweep,
-                                    auth=aiohttp.BasicAuth(rpc_username, rpc_password)) as response_sweep:
-                response_data = await response_sweep.json()
-                
-                if 'error' in response_data:
-                    message = response_data['error']['message']
-                    logging.error(f"Error sweeping funds: {message}")
-                    raise ValueError(f"Error sweeping funds: {message}")
-                
-                # Process and log the transaction hash list from the response.
-                tx_hash_list = response_data.get('result', {}).get('tx_hash_list', [])
-                if tx_hash_list:
-                    logging.info("Sweep transaction successfully sent.")
-                    for tx_hash in tx_hash_list:
-                        logging.info(f"Transaction Hash: {tx_hash}")
-                else:
-                    logging.info("No funds to sweep.")
-    
+        # sweep_all is not idempotent: a timed-out request may still have
+        # gone through, and resending it would double-spend the sweep. One
+        # attempt only; the periodic rescan retries the file later.
+        result = await _rpc(
+            rpc_url, basic_auth(rpc_username, rpc_password), "sweep_all",
+            {**_SWEEP_ALL_PARAMS,
+             "address": target_address,
+             "subaddr_indices": [subaddress_index]},
+            retries=1)
+
+        # Process and log the transaction hash list from the response.
+        tx_hash_list = result.get('tx_hash_list', [])
+        if tx_hash_list:
+            # One record per sweep; N per-hash records mostly cost handler
+            # flushes when the sweep fans out into several transactions.
+            log.info("Sweep transaction successfully sent. Tx hashes: %s", ",".join(tx_hash_list))
+        else:
+            log.info("No funds to sweep.")
+
     except Exception as e:
         # General exception handling to capture and log unexpected errors.
-        logging.error(f"Error sweeping funds: {e}")
+        log.error("Error sweeping funds: %s", e)
 
 
 async def validate_monero_address(address):
@@ -222,34 +271,38 @@ async def validate_monero_address(address):
         Exception: If there's an issue with the network request or an unexpected error occurs.
     """
     url = "http://127.0.0.1:38083/json_rpc"  # Adjust the URL as necessary
-    data = {
-        "jsonrpc": "2.0",
-        "id": "0",
-        "method": "validate_address",
-        "params": {
-            "address": address
-        }
-    }
-    headers = {'Content-Type': 'application/json'}
 
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=data, headers=headers) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    result = result.get('result', {})
-                    return (
-                        result.get('valid', False),
-                        result.get('integrated', False),
-                        result.get('subaddress', False),
-                        result.get('nettype', ''),
-                        result.get('openalias_address', '')
-                    )
-                else:
-                    error_message = await response.text()
-                    logging.error(f"Error validating address: HTTP {response.status} - {error_message}")
-                    raise Exception(f"Error validating address: HTTP {response.status}")
+    # Reject syntactically impossible addresses locally before spending an
+    # RPC on them; most invalid input (typos, truncation) fails here.
+    if not _ADDR_RE.match(address):
+        return False, False, False, '', ''
 
+    try:
+        result = await _rpc(url, None, "validate_address", {"address": address})
+        return (
+            result.get('valid', False),
+            result.get('integrated', False),
+            result.get('subaddress', False),
+            result.get('nettype', ''),
+            result.get('openalias_address', '')
+        )
     except Exception as e:
-        logging.error(f"Exception occurred during request: {e}")
-        raise  # Re-raise exception to handle it outside or log it appropriately.
\ No newline at end of file
+        log.error("Exception occurred during request: %s", e)
+        raise  # Re-raise exception to handle it outside or log it appropriately.
+
+
+async def validate_many(addresses):
+    """
+    Validates several Monero addresses concurrently.
+
+    Each address is an independent RPC, so they are fanned out with
+    asyncio.gather over the shared session's connection pool instead of
+    awaiting one at a time; the connector's per-host limit bounds the fan-out.
+
+    Args:
+        addresses (list[str]): The Monero addresses to be validated.
+
+    Returns:
+        list: One validate_monero_address result tuple per address, in order.
+    """
+    return await asyncio.gather(*(validate_monero_address(address) for address in addresses))
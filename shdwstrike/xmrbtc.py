@@ -1,55 +1,140 @@
 import asyncio
-import json
+import logging
+import msgspec
 from websockets import connect
 from websockets_proxy import Proxy, proxy_connect
 
+
+class Rate(msgspec.Struct):
+    """One currency entry in the oracle's crypto_rates payload."""
+    symbol: str
+    current_price: float
+
+
+class CryptoRatesMsg(msgspec.Struct):
+    """Envelope of an oracle push; fields beyond these are ignored."""
+    cmd: str
+    data: list[Rate] = msgspec.field(default_factory=list)
+
+
+# Reusable decoder parsing straight into the structs above, skipping the
+# intermediate dicts a generic json.loads would build per message.
+_msg_decoder = msgspec.json.Decoder(CryptoRatesMsg)
+
+log = logging.getLogger(__name__)
+
+#I am useing featherwallets onions price oracle needs to change probably
+WS_URI = "ws://7e6egbawekbkxzkv4244pqeqgoo4axko2imgjbedwnn6s5yb6b7oliqd.onion/ws"
+SOCKS5_PROXY_URL = 'socks5://127.0.0.1:9050'
+
+# Persistent websocket shared across calls. Building a Tor circuit takes
+# seconds, so the connection is kept open and only rebuilt after an error.
+_ws_conn = None
+
+async def _get_ws_connection():
+    """Return the shared websocket, connecting through the proxy if needed."""
+    global _ws_conn
+    if _ws_conn is None or _ws_conn.closed:
+        proxy = Proxy.from_url(SOCKS5_PROXY_URL)
+        _ws_conn = await proxy_connect(WS_URI, proxy=proxy).__aenter__()
+    return _ws_conn
+
+async def close_ws():
+    """Close the shared websocket. Call once at application shutdown."""
+    global _ws_conn
+    if _ws_conn is not None and not _ws_conn.closed:
+        await _ws_conn.close()
+    _ws_conn = None
+
+# Latest ratio pushed by the oracle, kept fresh by a single background task
+# so callers never block on the websocket themselves.
+_last_ratio = None
+_rate_ready = asyncio.Event()
+_pump_task = None
+
+# How long a first-time caller waits for the initial push before giving up.
+FIRST_RATE_TIMEOUT_SECONDS = 15
+
+async def _rate_pump():
+    """Keep _last_ratio updated from the oracle's pushes; reconnect with backoff."""
+    global _last_ratio
+    backoff = 1
+    while True:
+        try:
+            websocket = await _get_ws_connection()
+            backoff = 1
+            # Continuously listen for messages
+            while True:
+                # Receive and parse the WebSocket message. A stalled Tor
+                # circuit otherwise hangs recv() forever; on timeout the
+                # outer loop reconnects.
+                message = await asyncio.wait_for(websocket.recv(), timeout=60)
+                try:
+                    msg = _msg_decoder.decode(message)
+                except msgspec.ValidationError:
+                    # Not a crypto_rates-shaped message; ignore it.
+                    continue
+
+                # Check if the received message is the expected 'crypto_rates'
+                if msg.cmd == 'crypto_rates':
+                    ratio = calculate_xmr_btc_ratio(msg.data)
+                    if ratio is not None:
+                        _last_ratio = ratio
+                        _rate_ready.set()
+        except Exception as e:
+            log.error("Error encountered: %s", e)
+            # Drop the connection and retry with exponential backoff.
+            await close_ws()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
 async def get_xmr_btc_price():
     """
-    Fetches the exchange rate between XMR and BTC from a provided WebSocket service accessed via a SOCKS5 proxy.
-    
+    Returns the exchange rate between XMR and BTC as pushed by the oracle.
+
+    A single background task holds the Tor websocket and updates the cached
+    ratio on every crypto_rates push; this call is a memory read except on
+    the very first use, where it waits briefly for the first push to arrive.
+
     Returns:
         float: The exchange rate of XMR to BTC, rounded to 12 decimal places, or
-        None if the information could not be retrieved.
+        None if no rate has arrived within the timeout (the pump keeps
+        retrying in the background for later callers).
     """
-    #I am useing featherwallets onions price oracle needs to change probably 
-    ws_uri = "ws://7e6egbawekbkxzkv4244pqeqgoo4axko2imgjbedwnn6s5yb6b7oliqd.onion/ws"
-    socks5_proxy_url = 'socks5://127.0.0.1:9050'
-
-    try:
-        # Initialize a Proxy object with the SOCKS5 URL
-        proxy = Proxy.from_url(socks5_proxy_url)
-        
-        # Connect to the WebSocket service through the proxy
-        async with proxy_connect(ws_uri, proxy=proxy) as websocket:
-            # Continuously listen for messages
-            while True:
-                # Receive and parse the WebSocket message
-                message = await websocket.recv()
-                data = json.loads(message)
-                
-                # Check if the received message is the expected 'crypto_rates'
-                if 'cmd' in data and data['cmd'] == 'crypto_rates':
-                    crypto_rates = data.get('data', [])
-                    return calculate_xmr_btc_ratio(crypto_rates)
-    except Exception as e:
-        print(f"Error encountered: {e}")
-        return None
+    global _pump_task
+    if _pump_task is None or _pump_task.done():
+        _pump_task = asyncio.ensure_future(_rate_pump())
+    if _last_ratio is None:
+        # Bounded wait: if the oracle is unreachable, fail like the baseline
+        # did instead of queueing every caller behind a blocked coroutine.
+        try:
+            await asyncio.wait_for(_rate_ready.wait(), timeout=FIRST_RATE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            return None
+    return _last_ratio
 
 def calculate_xmr_btc_ratio(crypto_rates):
     """
     Calculates the exchange rate of Monero to Bitcoin from the given cryptocurrency rates.
     
     Args:
-        crypto_rates (list of dict): A list of dictionaries containing currency symbols and their current prices.
+        crypto_rates (list[Rate]): Decoded rate entries with symbol and current price.
     
     Returns:
         float: The calculated exchange rate, rounded to 12 decimal places, or
         None if the rates for XMR and BTC were not found.
     """
-    btc_rate = next((rate['current_price'] for rate in crypto_rates if rate['symbol'] == 'btc'), None)
-    xmr_rate = next((rate['current_price'] for rate in crypto_rates if rate['symbol'] == 'xmr'), None)
+    # Single pass over the rates, stopping as soon as both symbols are found.
+    btc_rate = xmr_rate = None
+    for rate in crypto_rates:
+        if rate.symbol == 'btc':
+            btc_rate = rate.current_price
+        elif rate.symbol == 'xmr':
+            xmr_rate = rate.current_price
+        if btc_rate is not None and xmr_rate is not None:
+            break
 
-    if btc_rate and xmr_rate:
+    if btc_rate and xmr_rate is not None:
         return round(xmr_rate / btc_rate, 12)
 
     return None
@@ -65,4 +150,9 @@ async def display_xmr_btc_price_ratio():
         print("Failed to fetch the price ratio.")
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(display_xmr_btc_price_ratio())